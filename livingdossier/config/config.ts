@@ -109,7 +109,22 @@ export const config: Config = {
     
     // Web search tool configuration
     webSearch: {
-      apiKey: process.env.SERPER_API_KEY || ''
+      apiKey: process.env.SERPER_API_KEY || '',
+      // Max number of URLs scraped in parallel by scrape_webpage
+      scrapeConcurrency: parseInt(process.env.SCRAPE_CONCURRENCY || '8'),
+      // Client-side request caps per second for each provider (0 disables the limiter)
+      serperRequestsPerSecond: parseInt(process.env.SERPER_REQUESTS_PER_SECOND || '20'),
+      jinaRequestsPerSecond: parseInt(process.env.JINA_REQUESTS_PER_SECOND || '0'),
+      firecrawlRequestsPerSecond: parseInt(process.env.FIRECRAWL_REQUESTS_PER_SECOND || '0'),
+      // In-memory result cache lifetimes in seconds (0 disables caching)
+      searchCacheTtl: parseInt(process.env.SEARCH_CACHE_TTL || '300'),
+      scrapeCacheTtl: parseInt(process.env.SCRAPE_CACHE_TTL || '3600'),
+      // Directory for the on-disk scrape cache; unset keeps scraped pages in memory only
+      scrapeDiskCacheDir: process.env.SCRAPE_DISK_CACHE_DIR || '',
+      // Total size the on-disk scrape cache is pruned back to
+      scrapeDiskCacheMaxBytes: parseInt(process.env.SCRAPE_DISK_CACHE_MAX_BYTES || String(256 * 1024 * 1024)),
+      // Scrape responses larger than this are aborted mid-download
+      maxScrapeBytes: parseInt(process.env.MAX_SCRAPE_BYTES || String(10 * 1024 * 1024))
     },
     
     // YouTube search tool configuration
@@ -2,8 +2,22 @@
 
 import { BaseTool, ToolInput, ToolOutput, OpenAIToolParameterProperties } from "./base-tool";
 import { logger } from "../../memory-framework/config";
-import axios from 'axios';
+import axios, { AxiosInstance, AxiosResponse } from 'axios';
+import http from 'http';
+import https from 'https';
 import { config } from '../../config/config';
+import {
+  AimdController,
+  DiskScrapeCache,
+  RateLimiter,
+  RateLimitTracker,
+  ScrapeResult,
+  Semaphore,
+  TtlCache,
+  dedupeResults,
+  nonNegativeOr,
+  normalizeUrl,
+} from './webSearchUtils';
 
 // --- ENHANCED INPUT INTERFACES ---
 
@@ -17,6 +31,15 @@ interface WebSearchInput extends ToolInput {
   social_platform?: "tiktok" | "instagram" | "facebook" | "twitter" | "reddit" | "linkedin";
 }
 
+interface WebSearchBatchInput extends ToolInput {
+  queries: string[];
+  search_type?: WebSearchInput["search_type"];
+  num_results?: number;
+  location?: string | null;
+  language?: string | null;
+  social_platform?: WebSearchInput["social_platform"];
+}
+
 interface ScrapeInput extends ToolInput {
   urls: string[]; // Expect an array of URLs for efficiency
 }
@@ -29,6 +52,9 @@ interface CrawlInput extends ToolInput {
 
 interface CheckCrawlStatusInput extends ToolInput {
   job_id: string;
+  // Poll internally until the crawl finishes instead of returning the current status
+  wait?: boolean;
+  max_wait_s?: number;
 }
 
 // --- SERPER API RESPONSE TYPES ---
@@ -92,6 +118,52 @@ interface CachedPatentsList {
   error?: string;
 }
 
+// --- PROVIDER LIMITS ---
+
+// Serper accepts up to 100 queries per batch request
+const SERPER_MAX_BATCH_SIZE = 100;
+
+// Internal polling schedule for check_crawl_status in wait mode
+const CRAWL_POLL_INITIAL_DELAY_MS = 2000;
+const CRAWL_POLL_MAX_DELAY_MS = 30000;
+// Upper bound on the model-supplied max_wait_s, so one tool call cannot poll indefinitely
+const CRAWL_MAX_WAIT_S = 600;
+const CRAWL_TERMINAL_FAILURE_STATUSES = new Set(['failed', 'cancelled']);
+
+// Retry policy for transient provider failures: exponential backoff with jitter
+const RETRY_BASE_DELAY_MS = 500;
+const RETRY_MAX_DELAY_MS = 10000;
+const RETRYABLE_STATUS_CODES = new Set([429, 500, 502, 503, 504]);
+const RETRYABLE_ERROR_CODES = new Set(['ECONNABORTED', 'ETIMEDOUT', 'ECONNRESET', 'ECONNREFUSED', 'EAI_AGAIN']);
+// Client-side timeouts: the provider may still be working on the request
+const TIMEOUT_ERROR_CODES = new Set(['ECONNABORTED', 'ETIMEDOUT']);
+
+interface ProviderGuard {
+  limiter: RateLimiter;
+  quota?: RateLimitTracker;
+  controller?: AimdController;
+}
+
+// One limiter per provider for the whole process, so the configured rate holds no matter
+// how many SerperWebSearchTool instances are created
+const serperLimiter = new RateLimiter(nonNegativeOr(config.tools.webSearch?.serperRequestsPerSecond, 20));
+const jinaLimiter = new RateLimiter(nonNegativeOr(config.tools.webSearch?.jinaRequestsPerSecond, 0));
+const firecrawlLimiter = new RateLimiter(nonNegativeOr(config.tools.webSearch?.firecrawlRequestsPerSecond, 0));
+// Process-wide like the limiters; tracked per provider so a throttled Jina does not pause Firecrawl
+const jinaQuota = new RateLimitTracker();
+const firecrawlQuota = new RateLimitTracker();
+// Bounds how many URLs are scraped from Jina/Firecrawl at once across all tool instances.
+// SCRAPE_CONCURRENCY is the ceiling: AIMD only backs off below it and recovers up to it.
+const scrapeSemaphore = new Semaphore(config.tools.webSearch?.scrapeConcurrency || 8);
+const scrapeController = new AimdController(scrapeSemaphore, 1, config.tools.webSearch?.scrapeConcurrency || 8);
+
+// Keep-alive agents shared by every tool instance, so repeated Serper/Jina/Firecrawl calls
+// reuse TCP+TLS connections; they live as long as the process, like the limiters above
+const httpClient: AxiosInstance = axios.create({
+  httpAgent: new http.Agent({ keepAlive: true, maxSockets: 100, maxFreeSockets: 20 }),
+  httpsAgent: new https.Agent({ keepAlive: true, maxSockets: 100, maxFreeSockets: 20 }),
+});
+
 // --- MAIN TOOL CLASS ---
 
 export class SerperWebSearchTool extends BaseTool {
@@ -135,6 +207,25 @@ export class SerperWebSearchTool extends BaseTool {
   private firecrawlApiKey: string;
   private jinaApiKey: string;
 
+  // axios aborts the download as soon as a body exceeds this, bounding per-URL memory
+  private maxScrapeBytes: number = config.tools.webSearch?.maxScrapeBytes || 10 * 1024 * 1024;
+  private searchCache = new TtlCache<ToolOutput>(nonNegativeOr(config.tools.webSearch?.searchCacheTtl, 300) * 1000);
+  private scrapeCache = new TtlCache<ScrapeResult>(nonNegativeOr(config.tools.webSearch?.scrapeCacheTtl, 3600) * 1000);
+  // Opt-in: only enabled when SCRAPE_DISK_CACHE_DIR points at a writable directory
+  private diskScrapeCache: DiskScrapeCache | null = config.tools.webSearch?.scrapeDiskCacheDir
+    ? new DiskScrapeCache(
+        config.tools.webSearch.scrapeDiskCacheDir,
+        nonNegativeOr(config.tools.webSearch.scrapeCacheTtl, 3600) * 1000,
+        5000,
+        config.tools.webSearch.scrapeDiskCacheMaxBytes || 256 * 1024 * 1024,
+        message => logger.warn(message)
+      )
+    : null;
+  // Wait-mode crawl polls in flight, keyed by job ID, so concurrent waiters share one poll loop
+  private inflightCrawlPolls = new Map<string, Promise<any>>();
+  // Scrapes currently in flight, keyed like scrapeCache, so concurrent callers share one request
+  private inflightScrapes = new Map<string, Promise<ScrapeResult>>();
+
   constructor() {
     super();
     
@@ -158,31 +249,22 @@ export class SerperWebSearchTool extends BaseTool {
       return { error: "Search query is required." };
     }
 
-    let finalQuery = params.query;
-    const searchType = params.search_type || "general";
-
-    // Enhance query for social media searches
-    if (searchType === 'social' && params.social_platform) {
-      finalQuery = `${params.query} site:${params.social_platform}.com`;
-    }
+    const { endpoint, payload, cacheKey } = this.buildSearchRequest(params);
+    const cached = this.searchCache.get(cacheKey);
+    if (cached) return cached;
 
     try {
-      const payload = {
-        q: finalQuery,
-        gl: params.location,
-        hl: params.language,
-        num: params.num_results || 10,
-      };
-
-      const response = await axios.post<SerperResponse>(
-        `https://google.serper.dev/${searchType === 'general' || searchType === 'social' ? 'search' : searchType}`,
+      const response = await this.callProvider({ limiter: serperLimiter }, () => httpClient.post<SerperResponse>(
+        endpoint,
         payload,
         { headers: { 'X-API-KEY': this.serperApiKey, 'Content-Type': 'application/json' } }
-      );
+      ));
 
       // Format the raw results into a clean, structured output
       const formattedResults = this.formatSerperResults(response.data);
-      return { result: "Search completed successfully", structuredData: formattedResults[0] };
+      const output: ToolOutput = { result: "Search completed successfully", structuredData: formattedResults[0] };
+      this.searchCache.set(cacheKey, output);
+      return output;
 
     } catch (error: any) {
       logger.error('Error executing Serper search:', error);
@@ -190,6 +272,54 @@ export class SerperWebSearchTool extends BaseTool {
     }
   }
 
+  /**
+   * Runs several searches of the same type using Serper's batch endpoint (an array payload),
+   * so N queries cost one HTTP request and one rate-limiter slot per chunk instead of N.
+   */
+  public async search_batch(params: WebSearchBatchInput): Promise<ToolOutput> {
+    if (!this.serperApiKey) {
+      return { error: "Serper API key is not configured." };
+    }
+    const queries = (params.queries || []).filter(query => query && query.trim());
+    if (queries.length === 0) {
+      return { error: "At least one search query is required." };
+    }
+
+    const requests = queries.map(query => this.buildSearchRequest({ ...params, query }));
+    const outputs: (ToolOutput | undefined)[] = requests.map(request => this.searchCache.get(request.cacheKey));
+    const missing = requests.map((request, index) => ({ request, index })).filter(({ index }) => !outputs[index]);
+
+    try {
+      for (let start = 0; start < missing.length; start += SERPER_MAX_BATCH_SIZE) {
+        const chunk = missing.slice(start, start + SERPER_MAX_BATCH_SIZE);
+        const response = await this.callProvider({ limiter: serperLimiter }, () => httpClient.post<SerperResponse[]>(
+          chunk[0].request.endpoint,
+          chunk.map(({ request }) => request.payload),
+          { headers: { 'X-API-KEY': this.serperApiKey, 'Content-Type': 'application/json' } }
+        ));
+        chunk.forEach(({ request, index }, position) => {
+          const data = response.data[position];
+          if (!data) return;
+          const output: ToolOutput = { result: "Search completed successfully", structuredData: this.formatSerperResults(data)[0] };
+          this.searchCache.set(request.cacheKey, output);
+          outputs[index] = output;
+        });
+      }
+    } catch (error: any) {
+      logger.error('Error executing Serper batch search:', error);
+      return { error: `Serper batch search failed: ${error.message}` };
+    }
+
+    return {
+      result: `Completed ${outputs.filter(Boolean).length} of ${queries.length} searches.`,
+      structuredData: {
+        result_type: "search_batch_results",
+        source_api: "serper",
+        results: queries.map((query, index) => ({ query, ...(outputs[index] || { error: "No result returned for this query." }) })),
+      }
+    };
+  }
+
   /**
    * Scrapes full content from multiple URLs. Prioritizes the free Jina AI service and falls back to the robust Firecrawl.
    */
@@ -198,7 +328,18 @@ export class SerperWebSearchTool extends BaseTool {
       return { error: "At least one URL is required for scraping." };
     }
 
-    const scrapePromises = params.urls.map(url => this.scrapeSingleUrl(url));
+    // Drop URLs that differ only by case, tracking params, fragment or trailing slash
+    const uniqueUrls = new Map<string, string>();
+    for (const url of params.urls) {
+      const canonical = normalizeUrl(url);
+      if (!uniqueUrls.has(canonical)) uniqueUrls.set(canonical, url);
+    }
+    const duplicateCount = params.urls.length - uniqueUrls.size;
+    if (duplicateCount > 0) {
+      logger.info(`Skipping ${duplicateCount} duplicate URL(s) in scrape batch`);
+    }
+
+    const scrapePromises = Array.from(uniqueUrls.values()).map(url => this.scrapeSingleUrl(url));
     const results = await Promise.all(scrapePromises);
 
     const successfulScrapes = results.filter(r => r.success);
@@ -228,11 +369,12 @@ export class SerperWebSearchTool extends BaseTool {
         payload.crawlerOptions = JSON.parse(params.crawler_options);
       }
 
-      const response = await axios.post(
+      // Starting a crawl creates a billed job, so only resend when it was certainly not accepted
+      const response = await this.callProvider(this.firecrawlGuard(), () => httpClient.post(
         'https://api.firecrawl.dev/v1/crawl',
         payload,
         { headers: { 'Authorization': `Bearer ${this.firecrawlApiKey}`, 'Content-Type': 'application/json' }}
-      );
+      ), 5, error => this.isUnsentRequestError(error));
       
       return { 
         result: `Crawl successfully started for ${params.url}. Use the 'check_crawl_status' tool with the returned job ID.`,
@@ -256,26 +398,28 @@ export class SerperWebSearchTool extends BaseTool {
     if (!params.job_id) return { error: "Job ID is required to check crawl status." };
 
     try {
-      const response = await axios.get(
-        `https://api.firecrawl.dev/v1/crawl/status/${params.job_id}`,
-        { headers: { 'Authorization': `Bearer ${this.firecrawlApiKey}`, 'Content-Type': 'application/json' }}
-      );
+      const crawl = params.wait
+        ? await this.waitForCrawl(params.job_id, Math.min(CRAWL_MAX_WAIT_S, Math.max(0, Number(params.max_wait_s ?? 300) || 0)) * 1000)
+        : await this.fetchCrawlStatus(params.job_id);
 
-      const status = response.data.status;
+      const status = crawl.status;
       if (status === "completed") {
         // In a real application, you would save this large data to a file/DB and return a pointer.
         // For now, we return a summary and the data itself.
         return {
-          result: `Crawl job complete. Found ${response.data.data.length} pages.`,
+          result: `Crawl job complete. Found ${crawl.data.length} pages.`,
           structuredData: {
             result_type: "crawl_completed",
             source_api: "firecrawl",
             status: "completed",
-            data: response.data.data
+            data: crawl.data
           }
         };
+      } else if (CRAWL_TERMINAL_FAILURE_STATUSES.has(status)) {
+        // A failed or cancelled crawl will never complete, so checking again would only loop
+        return { error: `Crawl job ${params.job_id} ended with status: ${status}.` };
       } else {
-        return { 
+        return {
           result: `Crawl is not complete yet. Current status: ${status}. Please check again later.`,
           structuredData: {
             result_type: "crawl_status",
@@ -292,19 +436,106 @@ export class SerperWebSearchTool extends BaseTool {
 
   // --- HELPER METHODS ---
 
-  private async scrapeSingleUrl(url: string): Promise<{ success: boolean; url: string; content?: string; error?: string; source: 'jina' | 'firecrawl' | 'none' }> {
+  private async fetchCrawlStatus(jobId: string): Promise<any> {
+    const response = await this.callProvider(this.firecrawlGuard(), () => httpClient.get(
+      `https://api.firecrawl.dev/v1/crawl/status/${jobId}`,
+      { headers: { 'Authorization': `Bearer ${this.firecrawlApiKey}`, 'Content-Type': 'application/json' }}
+    ));
+    return response.data;
+  }
+
+  /**
+   * Polls a crawl job with a growing delay until it completes, fails, or `maxWaitMs` elapses.
+   * Returns the last status payload seen.
+   */
+  private waitForCrawl(jobId: string, maxWaitMs: number): Promise<any> {
+    const inflight = this.inflightCrawlPolls.get(jobId);
+    if (inflight) return inflight;
+
+    const poll = (async () => {
+      const deadline = Date.now() + maxWaitMs;
+      let delay = CRAWL_POLL_INITIAL_DELAY_MS;
+      for (;;) {
+        const crawl = await this.fetchCrawlStatus(jobId);
+        if (crawl.status === "completed" || CRAWL_TERMINAL_FAILURE_STATUSES.has(crawl.status)) return crawl;
+        const remaining = deadline - Date.now();
+        if (remaining <= 0) return crawl;
+        await new Promise(resolve => setTimeout(resolve, Math.min(delay, remaining)));
+        delay = Math.min(CRAWL_POLL_MAX_DELAY_MS, delay * 1.5);
+      }
+    })();
+    this.inflightCrawlPolls.set(jobId, poll);
+    return poll.finally(() => this.inflightCrawlPolls.delete(jobId));
+  }
+
+  private buildSearchRequest(params: WebSearchInput): { endpoint: string; payload: { q: string; gl?: string | null; hl?: string | null; num: number }; cacheKey: string } {
+    let finalQuery = params.query;
+    const searchType = params.search_type || "general";
+
+    // Enhance query for social media searches
+    if (searchType === 'social' && params.social_platform) {
+      finalQuery = `${params.query} site:${params.social_platform}.com`;
+    }
+
+    const payload = {
+      q: finalQuery,
+      gl: params.location,
+      hl: params.language,
+      num: params.num_results || 10,
+    };
+    return {
+      endpoint: `https://google.serper.dev/${searchType === 'general' || searchType === 'social' ? 'search' : searchType}`,
+      payload,
+      cacheKey: JSON.stringify([searchType, payload.q.trim().toLowerCase(), payload.gl ?? null, payload.hl ?? null, payload.num]),
+    };
+  }
+
+  private async scrapeSingleUrl(url: string): Promise<ScrapeResult> {
+    const cacheKey = normalizeUrl(url);
+    const cached = this.scrapeCache.get(cacheKey);
+    if (cached) return { ...cached, url };
+
+    const inflight = this.inflightScrapes.get(cacheKey);
+    if (inflight) return { ...(await inflight), url };
+
+    const pending = this.loadPage(url, cacheKey).then(result => {
+      if (result.success) this.scrapeCache.set(cacheKey, result);
+      return result;
+    });
+    this.inflightScrapes.set(cacheKey, pending);
+    try {
+      return await pending;
+    } finally {
+      this.inflightScrapes.delete(cacheKey);
+    }
+  }
+
+  private async loadPage(url: string, cacheKey: string): Promise<ScrapeResult> {
+    const stored = await this.diskScrapeCache?.get(cacheKey);
+    if (stored) return { ...stored, url };
+
+    // Only the network fetch takes a scrape slot, so cache hits never queue behind slow scrapes
+    const result = await scrapeSemaphore.run(() => this.fetchPage(url));
+    if (result.success) await this.diskScrapeCache?.set(cacheKey, result);
+    return result;
+  }
+
+  private async fetchPage(url: string): Promise<ScrapeResult> {
     // Attempt 1: Jina AI (Free and fast)
     if (this.jinaApiKey) {
+      const jinaUrl = `https://r.jina.ai/${url}`;
       try {
-        const jinaUrl = `https://r.jina.ai/${url}`;
-        const response = await axios.get(jinaUrl, {
+        // Firecrawl is the fallback, so give Jina fewer attempts before moving on
+        const jinaGuard = { limiter: jinaLimiter, quota: jinaQuota, controller: scrapeController };
+        const response = await this.callProvider(jinaGuard, () => httpClient.get(jinaUrl, {
           headers: { 'Authorization': `Bearer ${this.jinaApiKey}`, 'Accept': 'application/json' },
-          timeout: 20000 // 20-second timeout
-        });
+          timeout: 20000, // 20-second timeout
+          maxContentLength: this.maxScrapeBytes
+        }), 2);
         if (response.data && response.data.data && response.data.data.content) {
           return { success: true, url, content: response.data.data.content, source: 'jina' };
         }
-      } catch (error) {
+      } catch (error: any) {
         logger.warn(`Jina AI scrape failed for ${url}, falling back to Firecrawl. Error: ${error}`);
       }
     }
@@ -312,11 +543,12 @@ export class SerperWebSearchTool extends BaseTool {
     // Attempt 2: Firecrawl (Robust fallback)
     if (this.firecrawlApiKey) {
       try {
-        const response = await axios.post(
+        // Retrying a 45-second timeout would hold the scrape slot for minutes
+        const response = await this.callProvider({ ...this.firecrawlGuard(), controller: scrapeController }, () => httpClient.post(
           'https://api.firecrawl.dev/v1/scrape',
           { url: url, pageOptions: { onlyMainContent: true } },
-          { headers: { 'Authorization': `Bearer ${this.firecrawlApiKey}`, 'Content-Type': 'application/json' }, timeout: 45000 }
-        );
+          { headers: { 'Authorization': `Bearer ${this.firecrawlApiKey}`, 'Content-Type': 'application/json' }, timeout: 45000, maxContentLength: this.maxScrapeBytes }
+        ), 5, error => !this.isTimeoutError(error));
         if (response.data && response.data.data && response.data.data.markdown) {
           return { success: true, url, content: response.data.data.markdown, source: 'firecrawl' };
         }
@@ -329,18 +561,85 @@ export class SerperWebSearchTool extends BaseTool {
     return { success: false, url, error: 'All scraping services failed or are not configured.', source: 'none' };
   }
 
+  private firecrawlGuard(): ProviderGuard {
+    return { limiter: firecrawlLimiter, quota: firecrawlQuota };
+  }
+
+  /**
+   * Sends a provider request under its rate limiter and quota tracker, retrying transient
+   * failures (429, 5xx, timeouts, dropped connections) with exponential backoff and full jitter.
+   * A Retry-After header from the provider takes precedence over the computed delay; one longer
+   * than RETRY_MAX_DELAY_MS fails the call instead of stalling it. `canRetry` narrows which
+   * overload errors are retried for requests that are not safe or not cheap to repeat.
+   */
+  private async callProvider<T>(
+    guard: ProviderGuard,
+    send: () => Promise<AxiosResponse<T>>,
+    maxAttempts = 5,
+    canRetry: (error: any) => boolean = () => true
+  ): Promise<AxiosResponse<T>> {
+    for (let attempt = 1; ; attempt++) {
+      await guard.quota?.waitIfLow(RETRY_MAX_DELAY_MS);
+      await guard.limiter.acquire();
+      try {
+        const response = await send();
+        guard.quota?.ingest(response.headers);
+        guard.controller?.record(false);
+        return response;
+      } catch (error: any) {
+        const retryable = this.isOverloadError(error);
+        guard.quota?.ingest(error.response?.headers);
+        guard.controller?.record(retryable);
+        if (!retryable || !canRetry(error) || attempt >= maxAttempts) throw error;
+
+        const retryAfterSeconds = parseFloat(error.response?.headers?.['retry-after']);
+        if (retryAfterSeconds * 1000 > RETRY_MAX_DELAY_MS) throw error;
+        const backoff = Math.min(RETRY_MAX_DELAY_MS, RETRY_BASE_DELAY_MS * 2 ** (attempt - 1));
+        const delay = !isNaN(retryAfterSeconds) ? retryAfterSeconds * 1000 : backoff * (0.5 + Math.random() * 0.5);
+        logger.warn(`Provider request failed (${error.response?.status ?? error.code}), retrying in ${Math.round(delay)}ms (attempt ${attempt}/${maxAttempts})`);
+        await new Promise(resolve => setTimeout(resolve, delay));
+      }
+    }
+  }
+
+  /**
+   * True for errors that signal provider saturation (rate limiting, 5xx, timeouts, dropped connections).
+   */
+  private isOverloadError(error: any): boolean {
+    const status = error?.response?.status;
+    if (status !== undefined) return RETRYABLE_STATUS_CODES.has(status);
+    return RETRYABLE_ERROR_CODES.has(error?.code);
+  }
+
+  /**
+   * True for a client-side timeout, after which the provider may still complete the request.
+   */
+  private isTimeoutError(error: any): boolean {
+    return error?.response === undefined && TIMEOUT_ERROR_CODES.has(error?.code);
+  }
+
+  /**
+   * True when the provider certainly did not act on the request: it was rate limited (429)
+   * or the connection was refused before anything was sent.
+   */
+  private isUnsentRequestError(error: any): boolean {
+    const status = error?.response?.status;
+    if (status !== undefined) return status === 429;
+    return error?.code === 'ECONNREFUSED';
+  }
+
   private formatSerperResults(data: SerperResponse): any[] {
     const results: any[] = [];
     if (data.answerBox) results.push({ type: 'answer_box', ...data.answerBox });
     if (data.knowledgeGraph) results.push({ type: 'knowledge_graph', ...data.knowledgeGraph });
-    if (data.organic) results.push({ type: 'web_results', results: data.organic });
+    if (data.organic) results.push({ type: 'web_results', results: dedupeResults(data.organic) });
     if (data.videos) results.push({ type: 'video_list', results: data.videos });
     if (data.images) results.push({ type: 'image_list', results: data.images });
     if (data.news) results.push({ 
       type: 'news_list', 
       result_type: 'news_list',
       source_api: 'serper',
-      results: data.news 
+      results: dedupeResults(data.news)
     } as CachedNewsList);
     if (data.shopping) results.push({ type: 'product_list', results: data.shopping });
     if (data.places) results.push({ 
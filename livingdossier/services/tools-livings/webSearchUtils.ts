@@ -0,0 +1,445 @@
+//livingdossier/services/tools-livings/webSearchUtils.ts
+
+import crypto from 'crypto';
+import { promises as fs } from 'fs';
+import path from 'path';
+
+export interface ScrapeResult {
+  success: boolean;
+  url: string;
+  content?: string;
+  error?: string;
+  source: 'jina' | 'firecrawl' | 'none';
+}
+
+// --- CONFIG HELPERS ---
+
+/**
+ * Returns `value` when it is a finite, non-negative number, otherwise `fallback`. Config values
+ * come from parseInt, which yields NaN for a malformed env var, and NaN slips past `??`.
+ */
+export function nonNegativeOr(value: unknown, fallback: number): number {
+  return typeof value === 'number' && Number.isFinite(value) && value >= 0 ? value : fallback;
+}
+
+// --- CONCURRENCY HELPERS ---
+
+/**
+ * Promise-based counting semaphore whose limit can be resized at runtime.
+ */
+export class Semaphore {
+  private active = 0;
+  private waiters: (() => void)[] = [];
+
+  constructor(private limit: number) {}
+
+  get currentLimit(): number {
+    return this.limit;
+  }
+
+  setLimit(limit: number): void {
+    this.limit = limit;
+    this.drain();
+  }
+
+  async acquire(): Promise<void> {
+    if (this.active < this.limit) {
+      this.active++;
+      return;
+    }
+    await new Promise<void>(resolve => this.waiters.push(resolve));
+  }
+
+  release(): void {
+    this.active--;
+    this.drain();
+  }
+
+  async run<T>(fn: () => Promise<T>): Promise<T> {
+    await this.acquire();
+    try {
+      return await fn();
+    } finally {
+      this.release();
+    }
+  }
+
+  private drain(): void {
+    while (this.active < this.limit && this.waiters.length > 0) {
+      this.active++;
+      this.waiters.shift()!();
+    }
+  }
+}
+
+/**
+ * Additive-increase / multiplicative-decrease controller for scrape concurrency.
+ * Every `windowSize` consecutive successes grow the limit by `alpha`; an overload error
+ * (429, 5xx, timeout) shrinks it by `beta`. Latency alone never backs off, since Jina and
+ * Firecrawl renders routinely take tens of seconds.
+ */
+export class AimdController {
+  private concurrency: number;
+  private successes = 0;
+
+  constructor(
+    private semaphore: Semaphore,
+    private minConcurrency = 1,
+    private maxConcurrency = 16,
+    private alpha = 0.5,
+    private beta = 0.5,
+    private windowSize = 10
+  ) {
+    this.concurrency = semaphore.currentLimit;
+  }
+
+  record(failed: boolean): void {
+    if (failed) {
+      this.concurrency = Math.max(this.minConcurrency, this.concurrency * this.beta);
+      // Start a fresh window so one bad burst is not counted twice
+      this.successes = 0;
+    } else if (++this.successes >= this.windowSize) {
+      this.concurrency = Math.min(this.maxConcurrency, this.concurrency + this.alpha);
+      this.successes = 0;
+    }
+
+    const limit = Math.max(this.minConcurrency, Math.floor(this.concurrency));
+    if (limit !== this.semaphore.currentLimit) this.semaphore.setLimit(limit);
+  }
+}
+
+/**
+ * Sliding-window limiter: allows at most `limit` acquisitions per `windowMs`.
+ * Callers wait for a free slot instead of sending a request that would be rejected with a 429.
+ */
+export class RateLimiter {
+  private timestamps: number[] = [];
+  private queue: Promise<void> = Promise.resolve();
+
+  constructor(private limit: number, private windowMs: number = 1000) {}
+
+  acquire(): Promise<void> {
+    if (this.limit <= 0) return Promise.resolve();
+    // Chain acquisitions so concurrent callers are granted slots in order
+    const slot = this.queue.then(() => this.waitForSlot());
+    this.queue = slot.catch(() => undefined);
+    return slot;
+  }
+
+  private async waitForSlot(): Promise<void> {
+    for (;;) {
+      const now = Date.now();
+      while (this.timestamps.length > 0 && this.timestamps[0] <= now - this.windowMs) {
+        this.timestamps.shift();
+      }
+      if (this.timestamps.length < this.limit) {
+        this.timestamps.push(now);
+        return;
+      }
+      await new Promise(resolve => setTimeout(resolve, this.timestamps[0] + this.windowMs - now));
+    }
+  }
+}
+
+// Reset and Retry-After times further out than this are treated as malformed headers
+const RATE_LIMIT_MAX_HORIZON_MS = 24 * 60 * 60 * 1000;
+
+/**
+ * Tracks the rate-limit headers a provider returns (x-ratelimit-*, retry-after) and
+ * pauses callers until the reset time when the remaining quota runs low. Only an explicit
+ * Retry-After or an exhausted quota makes callers fail fast; a low quota never refuses a request.
+ */
+export class RateLimitTracker {
+  private remaining: number | null = null;
+  private limit: number | null = null;
+  private resumeAt = 0;
+  // True when the provider asked us to back off (Retry-After) or reported zero remaining quota
+  private blocked = false;
+
+  ingest(headers: Record<string, any> | undefined): void {
+    if (!headers) return;
+    const remaining = RateLimitTracker.parseCount(headers['x-ratelimit-remaining']);
+    const limit = RateLimitTracker.parseCount(headers['x-ratelimit-limit']);
+    if (remaining !== null) this.remaining = remaining;
+    if (limit !== null) this.limit = limit;
+
+    const retryAt = RateLimitTracker.parseRetryAfter(headers['retry-after']);
+    const resetAt = RateLimitTracker.parseResetTime(headers['x-ratelimit-reset']);
+    // The latest headers win, so a stale or bad value is replaced as soon as the provider answers again
+    if (retryAt !== null) {
+      this.resumeAt = retryAt;
+      this.blocked = true;
+    } else if (resetAt !== null && this.isLow()) {
+      this.resumeAt = resetAt;
+      this.blocked = this.remaining === 0;
+    } else if (remaining !== null && !this.isLow()) {
+      this.resumeAt = 0;
+      this.blocked = false;
+    }
+  }
+
+  /**
+   * Waits out a low quota that resets within `maxWaitMs`. A later reset throws when the provider
+   * blocked us, and otherwise lets the request through rather than stalling it.
+   */
+  async waitIfLow(maxWaitMs: number): Promise<void> {
+    const delay = this.resumeAt - Date.now();
+    if (delay <= 0) {
+      this.resumeAt = 0;
+      this.blocked = false;
+      return;
+    }
+    if (delay > maxWaitMs) {
+      if (this.blocked) {
+        throw new Error(`Provider rate limit exhausted; quota resets in ${Math.ceil(delay / 1000)}s`);
+      }
+      return;
+    }
+    await new Promise(resolve => setTimeout(resolve, delay));
+  }
+
+  private isLow(threshold = 0.1): boolean {
+    if (this.remaining === null) return false;
+    if (this.remaining <= 2) return true;
+    return this.limit !== null && this.limit > 0 && this.remaining / this.limit < threshold;
+  }
+
+  /** Non-negative finite number, or null; rejects units and other trailing text. */
+  private static parseCount(value: any): number | null {
+    if (value === undefined || value === null || String(value).trim() === '') return null;
+    const count = Number(value);
+    return Number.isFinite(count) && count >= 0 ? count : null;
+  }
+
+  /** Accepts an epoch timestamp (seconds or milliseconds) or a delta in seconds. */
+  private static parseResetTime(value: any): number | null {
+    const seconds = RateLimitTracker.parseCount(value);
+    if (seconds === null) return null;
+    const resetAt = seconds > 1e12 ? seconds : seconds > 1e9 ? seconds * 1000 : Date.now() + seconds * 1000;
+    return RateLimitTracker.withinHorizon(resetAt);
+  }
+
+  /** Accepts either delta-seconds or an HTTP date, per RFC 9110. */
+  private static parseRetryAfter(value: any): number | null {
+    if (value === undefined || value === null) return null;
+    const seconds = RateLimitTracker.parseCount(value);
+    if (seconds !== null) return RateLimitTracker.withinHorizon(Date.now() + seconds * 1000);
+    const date = Date.parse(String(value));
+    return isNaN(date) ? null : RateLimitTracker.withinHorizon(date);
+  }
+
+  /** Drops times already past or implausibly far in the future. */
+  private static withinHorizon(time: number): number | null {
+    const now = Date.now();
+    return time > now && time - now <= RATE_LIMIT_MAX_HORIZON_MS ? time : null;
+  }
+}
+
+// --- CACHING HELPERS ---
+
+// Query parameters that only carry tracking/attribution data and never change page content
+const TRACKING_PARAMS = new Set([
+  'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+  'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'ref_src',
+]);
+
+/**
+ * Canonicalizes a URL for deduplication and cache lookups: lower-cased host, default port
+ * dropped, no fragment, no tracking params, no trailing slash on non-root paths.
+ * Unparseable input is returned trimmed so it still works as a key.
+ */
+export function normalizeUrl(rawUrl: string): string {
+  try {
+    const parsed = new URL(rawUrl.trim());
+    parsed.hostname = parsed.hostname.toLowerCase();
+    parsed.hash = '';
+    if (parsed.pathname.length > 1) parsed.pathname = parsed.pathname.replace(/\/+$/, '');
+    for (const key of Array.from(parsed.searchParams.keys())) {
+      if (TRACKING_PARAMS.has(key.toLowerCase())) parsed.searchParams.delete(key);
+    }
+    return parsed.toString();
+  } catch {
+    return rawUrl.trim();
+  }
+}
+
+/**
+ * Small in-memory TTL cache with insertion-order eviction once `maxEntries` is reached.
+ */
+export class TtlCache<V> {
+  private entries = new Map<string, { expiresAt: number; value: V }>();
+
+  constructor(private ttlMs: number, private maxEntries = 500) {}
+
+  get(key: string): V | undefined {
+    const entry = this.entries.get(key);
+    if (!entry) return undefined;
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+    return entry.value;
+  }
+
+  set(key: string, value: V): void {
+    if (this.ttlMs <= 0) return;
+    this.entries.delete(key);
+    if (this.entries.size >= this.maxEntries) {
+      const oldestKey = this.entries.keys().next().value;
+      if (oldestKey !== undefined) this.entries.delete(oldestKey);
+    }
+    this.entries.set(key, { expiresAt: Date.now() + this.ttlMs, value });
+  }
+
+  delete(key: string): void {
+    this.entries.delete(key);
+  }
+}
+
+// How often DiskScrapeCache prunes expired files and enforces its file and byte caps
+const DISK_CACHE_SWEEP_INTERVAL_MS = 10 * 60 * 1000;
+// Writing more than this share of the byte cap since the last sweep triggers one early
+const DISK_CACHE_SWEEP_WRITE_FRACTION = 0.1;
+// Expired files are kept for this many extra TTLs so an unchanged re-fetch can reuse them
+const DISK_CACHE_GRACE_TTLS = 1;
+
+/**
+ * Disk-backed scrape cache so pages survive process restarts. One JSON file per URL,
+ * named by the URL's SHA-256; files are only rewritten when the page content changes.
+ * Freshness is tracked with the file's mtime so an unchanged page never has to be re-encoded.
+ * Expired files are no longer served but stay on disk for a grace period; a periodic sweep
+ * deletes them after that and keeps at most `maxFiles` entries totalling at most `maxBytes`,
+ * dropping the least recently refreshed first. Write and sweep failures are never thrown;
+ * they are reported through `warn`.
+ */
+export class DiskScrapeCache {
+  // Content hash of the file last written/read for each key, to detect unchanged pages without
+  // reading the file; kept as long as the file itself so it outlives the file's freshness
+  private knownHashes: TtlCache<string>;
+  private dirReady = false;
+  private lastSweepAt = 0;
+  private bytesSinceSweep = 0;
+  private sweeping = false;
+  private retentionMs: number;
+
+  constructor(
+    private dir: string,
+    private ttlMs: number,
+    private maxFiles = 5000,
+    private maxBytes = 256 * 1024 * 1024,
+    private warn: (message: string) => void = () => undefined
+  ) {
+    this.retentionMs = ttlMs * (1 + DISK_CACHE_GRACE_TTLS);
+    this.knownHashes = new TtlCache<string>(this.retentionMs, maxFiles);
+  }
+
+  async get(key: string): Promise<ScrapeResult | undefined> {
+    if (this.ttlMs <= 0) return undefined;
+    const file = this.fileFor(key);
+    try {
+      const stat = await fs.stat(file);
+      if (Date.now() - stat.mtimeMs > this.ttlMs) return undefined;
+      const entry = JSON.parse(await fs.readFile(file, 'utf8'));
+      this.knownHashes.set(key, entry.contentHash);
+      return entry.result as ScrapeResult;
+    } catch {
+      return undefined;
+    }
+  }
+
+  async set(key: string, result: ScrapeResult): Promise<void> {
+    if (this.ttlMs <= 0) return;
+    const contentHash = crypto.createHash('sha256').update(result.content || '').digest('hex');
+    const file = this.fileFor(key);
+    try {
+      if (this.knownHashes.get(key) === contentHash) {
+        // Unchanged page: only refresh the timestamp, unless the file has since been swept
+        const now = new Date();
+        const refreshed = await fs.utimes(file, now, now).then(() => true, () => false);
+        if (refreshed) {
+          this.knownHashes.set(key, contentHash);
+          return;
+        }
+      }
+      if (!this.dirReady) {
+        await fs.mkdir(this.dir, { recursive: true });
+        this.dirReady = true;
+      }
+      const body = JSON.stringify({ contentHash, result });
+      await fs.writeFile(file, body);
+      this.knownHashes.set(key, contentHash);
+      this.bytesSinceSweep += Buffer.byteLength(body);
+    } catch (error) {
+      this.knownHashes.delete(key);
+      this.dirReady = false;
+      this.warn(`Failed to persist scrape cache entry for ${key}: ${error}`);
+      return;
+    }
+    void this.sweep();
+  }
+
+  private async sweep(): Promise<void> {
+    const now = Date.now();
+    const writtenEnough = this.bytesSinceSweep > this.maxBytes * DISK_CACHE_SWEEP_WRITE_FRACTION;
+    // Overlapping sweeps would each count the same files and prune past the caps
+    if (this.sweeping || (now - this.lastSweepAt < DISK_CACHE_SWEEP_INTERVAL_MS && !writtenEnough)) return;
+    this.sweeping = true;
+    this.lastSweepAt = now;
+    this.bytesSinceSweep = 0;
+    try {
+      const live: { file: string; mtimeMs: number; size: number }[] = [];
+      let totalBytes = 0;
+      for (const name of await fs.readdir(this.dir)) {
+        if (!name.endsWith('.json')) continue;
+        const file = path.join(this.dir, name);
+        const stat = await fs.stat(file).catch(() => null);
+        if (!stat) continue;
+        if (now - stat.mtimeMs > this.retentionMs) {
+          await fs.unlink(file).catch(() => undefined);
+        } else {
+          live.push({ file, mtimeMs: stat.mtimeMs, size: stat.size });
+          totalBytes += stat.size;
+        }
+      }
+      live.sort((a, b) => a.mtimeMs - b.mtimeMs);
+      let count = live.length;
+      for (const entry of live) {
+        if (count <= this.maxFiles && totalBytes <= this.maxBytes) break;
+        await fs.unlink(entry.file).catch(() => undefined);
+        count--;
+        totalBytes -= entry.size;
+      }
+    } catch (error) {
+      this.warn(`Failed to sweep scrape cache directory ${this.dir}: ${error}`);
+    } finally {
+      this.sweeping = false;
+    }
+  }
+
+  private fileFor(key: string): string {
+    return path.join(this.dir, `${crypto.createHash('sha256').update(key).digest('hex')}.json`);
+  }
+}
+
+// --- RESULT DEDUPLICATION ---
+
+/**
+ * Drops duplicate search hits (mirrors, syndicated copies) before they reach the LLM: a hit
+ * is a duplicate when its normalized title and URL path match an earlier one. Serper returns
+ * hits in rank order, so the first one seen is the best-ranked and is the one kept.
+ */
+export function dedupeResults<T extends { title?: string; link?: string }>(results: T[]): T[] {
+  const seen = new Set<string>();
+  return results.filter(result => {
+    let pathname = '';
+    try {
+      pathname = new URL(result.link || '').pathname.replace(/\/+$/, '');
+    } catch {
+      return true;
+    }
+    const key = `${(result.title || '').trim().toLowerCase()}|${pathname}`;
+    if (seen.has(key)) return false;
+    seen.add(key);
+    return true;
+  });
+}
@@ -6,6 +6,89 @@ import numpy as np
 from datetime import datetime, timedelta
 import argparse
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; without it the whole file is parsed at once
+    ijson = None
+
+# The only transaction fields the metrics below read; everything else is dropped while parsing
+TRANSACTION_FIELDS = ('date', 'amount', 'category')
+
+
+def _starts_with_array(f):
+    """Peek at the first significant byte of f, then rewind: True for a top-level JSON array."""
+    while True:
+        chunk = f.read(4096)
+        head = chunk.lstrip()
+        if head or not chunk:
+            f.seek(0)
+            return head[:1] == b'['
+
+
+def _frame_from_records(records):
+    columns = {field: [] for field in TRANSACTION_FIELDS}
+    present = set()
+    count = 0
+    for record in records:
+        count += 1
+        for field, values in columns.items():
+            if field in record:
+                present.add(field)
+            values.append(record.get(field))
+    return pd.DataFrame(
+        {field: values for field, values in columns.items() if field in present},
+        index=pd.RangeIndex(count),
+    )
+
+
+def load_transactions(path):
+    """Load the transactions as a DataFrame holding only TRANSACTION_FIELDS.
+
+    A list of records is streamed one record at a time with ijson, so peak memory is
+    bounded by the projected columns instead of the full list of parsed dicts.
+    Column-oriented input ({"date": [...], "amount": [...]}) is parsed whole and handed
+    to pandas, as the script always accepted it. Any other JSON object raises ValueError.
+    """
+    with open(path, 'rb') as f:
+        if ijson and _starts_with_array(f):
+            df = _frame_from_records(ijson.items(f, 'item', use_float=True))
+        else:
+            raw = f.read()
+            data = orjson.loads(raw) if orjson else json.loads(raw)
+            if isinstance(data, list):
+                df = _frame_from_records(data)
+            else:
+                columns = [field for field in TRANSACTION_FIELDS if field in data]
+                if not columns:
+                    raise ValueError(
+                        f"Expected a list of transactions or columns named {', '.join(TRANSACTION_FIELDS)}"
+                    )
+                df = pd.DataFrame(data, columns=columns)
+    if 'category' in df.columns:
+        # Low-cardinality labels: grouping on integer codes is much cheaper than hashing strings
+        df['category'] = df['category'].astype('category')
+    return df
+
+
+def _to_builtin(value):
+    """json.dumps hook for the numpy arrays and scalars orjson would serialize natively."""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def emit(output):
+    if orjson:
+        sys.stdout.buffer.write(orjson.dumps(output, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) + b"\n")
+    else:
+        print(json.dumps(output, default=_to_builtin))
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--data_file', required=True)
@@ -13,39 +96,56 @@ def main():
     args = parser.parse_args()
     
     # Load financial data
-    with open(args.data_file, 'r') as f:
-        data = json.load(f)
+    df = load_transactions(args.data_file)
     
-    df = pd.DataFrame(data)
+    # Parse dates once; both the date range and the monthly trends reuse the result
+    date_start = date_end = None
+    if 'date' in df.columns:
+        raw_dates = df['date']
+        # Always normalize to UTC: mixed offsets only share a dtype in UTC, and applying the same
+        # rule to every input keeps a row's month independent of the other rows' offsets.
+        # Naive timestamps are read as UTC, so their months are unchanged.
+        df['date'] = pd.to_datetime(raw_dates, utc=True)
+        if df['date'].notna().any():
+            # Report the input strings at the temporal extremes rather than the lexicographic ones
+            date_start = raw_dates[df['date'].idxmin()]
+            date_end = raw_dates[df['date'].idxmax()]
     
     # Basic financial metrics
     results = {
         "total_transactions": len(df),
         "date_range": {
-            "start": df['date'].min() if 'date' in df.columns else None,
-            "end": df['date'].max() if 'date' in df.columns else None
+            "start": date_start,
+            "end": date_end
         }
     }
     
     # Revenue and expense analysis
     if 'amount' in df.columns:
-        results["total_amount"] = float(df['amount'].sum())
-        results["average_transaction"] = float(df['amount'].mean())
-        results["largest_transaction"] = float(df['amount'].max())
-        results["smallest_transaction"] = float(df['amount'].min())
+        # np.float64 subclasses float, so the scalars serialize as-is with orjson or json
+        amounts = df['amount'].astype(np.float64, copy=False)
+        results["total_amount"] = amounts.sum()
+        results["average_transaction"] = amounts.mean()
+        results["largest_transaction"] = amounts.max()
+        results["smallest_transaction"] = amounts.min()
     
     # Category analysis
-    if 'category' in df.columns:
-        category_summary = df.groupby('category')['amount'].agg(['sum', 'count', 'mean']).to_dict()
-        results["by_category"] = category_summary
+    if 'category' in df.columns and 'amount' in df.columns:
+        # Group the float64 amounts, not the raw column: string amounts would otherwise concatenate
+        grouped = amounts.groupby(df['category'], observed=True).agg(['sum', 'count', 'mean']).sort_index()
+        labels = grouped.index.tolist()
+        results["by_category"] = {
+            stat: dict(zip(labels, grouped[stat].tolist())) for stat in ('sum', 'count', 'mean')
+        }
     
     # Monthly trends
     if 'date' in df.columns and 'amount' in df.columns:
-        df['date'] = pd.to_datetime(df['date'])
-        monthly = df.groupby(df['date'].dt.to_period('M'))['amount'].sum()
+        # Bucket by month with a single datetime64[M] cast instead of one Period object per row
+        months = df['date'].dt.tz_localize(None).to_numpy().astype('datetime64[M]')
+        monthly = amounts.groupby(months).sum()
         results["monthly_trends"] = {
-            "periods": [str(p) for p in monthly.index],
-            "amounts": monthly.values.tolist()
+            "periods": np.datetime_as_string(monthly.index.to_numpy(), unit='M').tolist(),
+            "amounts": monthly.to_numpy()
         }
     
     # Output
@@ -64,7 +164,7 @@ def main():
         ]
     }
     
-    print(json.dumps(output))
+    emit(output)
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,42 @@
 #!/usr/bin/env python3
 import sys
 import json
+import mmap
 import pandas as pd
 import numpy as np
-from scipy import stats
 import argparse
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
+
+
+def load_data(path):
+    with open(path, 'rb') as f:
+        if orjson:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty files cannot be mapped
+                return orjson.loads(b'')
+            # Parse straight from the page cache instead of copying the file into a bytes object
+            with mapped, memoryview(mapped) as view:
+                return orjson.loads(view)
+        return json.loads(f.read())
+
+
+def _is_constant(mean, m2):
+    """scipy.stats' test for a column whose variance is only rounding noise around its mean."""
+    return m2 <= (np.finfo(np.float64).resolution * mean) ** 2
+
+
+def emit(output):
+    if orjson:
+        sys.stdout.buffer.write(orjson.dumps(output, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) + b"\n")
+    else:
+        print(json.dumps(output))
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--data_file', required=True)
@@ -14,8 +45,7 @@ def main():
     args = parser.parse_args()
     
     # Load data
-    with open(args.data_file, 'r') as f:
-        data = json.load(f)
+    data = load_data(args.data_file)
     
     df = pd.DataFrame(data)
     columns = args.columns.split(',')
@@ -25,37 +55,64 @@ def main():
     analysis_cols = [col for col in columns if col in numeric_cols]
     
     if not analysis_cols:
-        print(json.dumps({
+        emit({
             "error": "No numeric columns found for analysis",
             "available_columns": list(df.columns),
             "numeric_columns": numeric_cols
-        }))
+        })
         return
     
     results = {}
     
-    # Descriptive statistics
-    for col in analysis_cols:
-        if col in df.columns:
-            series = df[col].dropna()
-            if len(series) > 0:
-                results[col] = {
-                    "mean": float(series.mean()),
-                    "median": float(series.median()),
-                    "std": float(series.std()),
-                    "min": float(series.min()),
-                    "max": float(series.max()),
-                    "skewness": float(stats.skew(series)),
-                    "kurtosis": float(stats.kurtosis(series)),
-                    "count": int(series.count())
-                }
+    # Descriptive statistics, computed for all columns at once
+    unique_cols = list(dict.fromkeys(analysis_cols))
+    counts = df[unique_cols].count()
+    stat_cols = [col for col in unique_cols if counts[col] > 0]
+    if stat_cols:
+        desc = df[stat_cols].agg(['mean', 'median', 'std', 'min', 'max', 'count'])
+        # Population (biased) skewness and excess kurtosis, matching scipy.stats defaults
+        values = df[stat_cols].to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nanmean(values, axis=0)
+            centered = values - mean
+            # Higher powers by multiplication: reuse the squares instead of calling pow per element
+            squared = centered * centered
+            m2 = np.nanmean(squared, axis=0)
+            # Like scipy, constant columns have undefined moments rather than ratios of rounding noise
+            constant = _is_constant(mean, m2)
+            skewness = np.where(constant, np.nan, np.nanmean(squared * centered, axis=0) / m2 ** 1.5)
+            squared *= squared
+            kurtosis = np.where(constant, np.nan, np.nanmean(squared, axis=0) / m2 ** 2 - 3.0)
+        for i, col in enumerate(stat_cols):
+            results[col] = {
+                "mean": float(desc.at['mean', col]),
+                "median": float(desc.at['median', col]),
+                "std": float(desc.at['std', col]),
+                "min": float(desc.at['min', col]),
+                "max": float(desc.at['max', col]),
+                "skewness": float(skewness[i]),
+                "kurtosis": float(kurtosis[i]),
+                "count": int(desc.at['count', col])
+            }
     
     # Correlation matrix if multiple columns
     if len(analysis_cols) > 1:
-        corr_data = df[analysis_cols].corr()
+        matrix = df[analysis_cols].to_numpy(dtype=np.float64)
+        if (
+            matrix.shape[0] < 2
+            or np.isnan(matrix).any()
+            or _is_constant(matrix.mean(axis=0), matrix.var(axis=0)).any()
+        ):
+            # pandas correlates missing values pairwise and reports NaN for constant columns,
+            # where corrcoef would turn rounding noise into spurious coefficients
+            corr_values = df[analysis_cols].corr().to_numpy()
+        else:
+            corr_values = np.corrcoef(matrix, rowvar=False)
+            # Match pandas: an exact 1.0 on the diagonal
+            np.fill_diagonal(corr_values, 1.0)
         results["correlation_matrix"] = {
-            "values": corr_data.values.tolist(),
-            "columns": corr_data.columns.tolist()
+            "values": corr_values.tolist(),
+            "columns": list(analysis_cols)
         }
     
     # Output results
@@ -69,7 +126,7 @@ def main():
         ]
     }
     
-    print(json.dumps(output))
+    emit(output)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'financial_analytics.py')
+
+
+def run_script(data):
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(data, f)
+    try:
+        return subprocess.run(
+            [sys.executable, SCRIPT, '--data_file', f.name, '--analysis_id', 'test'],
+            capture_output=True, text=True
+        )
+    finally:
+        os.unlink(f.name)
+
+
+def run_analysis(data):
+    completed = run_script(data)
+    if completed.returncode != 0:
+        raise AssertionError(completed.stderr)
+    return json.loads(completed.stdout)['results']
+
+
+def is_missing(value):
+    # NaN is written as null by orjson and as NaN by the stdlib json fallback
+    return value is None or math.isnan(value)
+
+
+class LoadTransactionsTest(unittest.TestCase):
+    def test_column_oriented_input(self):
+        results = run_analysis({
+            'date': ['2024-01-05', '2024-02-01'],
+            'amount': [10, 20.5],
+            'category': ['b', 'a'],
+            'note': ['x', 'y'],
+        })
+        self.assertEqual(results['total_transactions'], 2)
+        self.assertEqual(results['total_amount'], 30.5)
+        self.assertEqual(results['monthly_trends'], {'periods': ['2024-01', '2024-02'], 'amounts': [10.0, 20.5]})
+
+    def test_object_without_transaction_fields_is_rejected(self):
+        completed = run_script({'entities': {}, 'metrics': {}, 'time_series': []})
+        self.assertNotEqual(completed.returncode, 0)
+        self.assertIn('ValueError', completed.stderr)
+
+    def test_empty_list(self):
+        results = run_analysis([])
+        self.assertEqual(results['total_transactions'], 0)
+        self.assertEqual(results['date_range'], {'start': None, 'end': None})
+
+
+class AmountsTest(unittest.TestCase):
+    def test_all_null_amounts(self):
+        results = run_analysis([
+            {'date': '2024-01-05', 'amount': None, 'category': 'a'},
+            {'date': '2024-02-01', 'amount': None, 'category': 'b'},
+        ])
+        self.assertEqual(results['total_amount'], 0.0)
+        self.assertTrue(is_missing(results['average_transaction']))
+        self.assertEqual(results['monthly_trends']['amounts'], [0.0, 0.0])
+
+    def test_string_amounts_are_summed_numerically_by_category(self):
+        results = run_analysis([
+            {'category': 'x', 'amount': '5'},
+            {'category': 'x', 'amount': '7'},
+        ])
+        self.assertEqual(results['total_amount'], 12.0)
+        self.assertEqual(results['by_category']['sum'], {'x': 12.0})
+        self.assertEqual(results['by_category']['mean'], {'x': 6.0})
+
+    def test_by_category_keys_are_sorted(self):
+        results = run_analysis([
+            {'category': 'zeta', 'amount': 1},
+            {'category': 'alpha', 'amount': 2},
+            {'category': 'mid', 'amount': 3},
+            {'category': 'alpha', 'amount': 4},
+        ])
+        for stat in ('sum', 'count', 'mean'):
+            self.assertEqual(list(results['by_category'][stat]), ['alpha', 'mid', 'zeta'])
+        self.assertEqual(results['by_category']['count'], {'alpha': 2, 'mid': 1, 'zeta': 1})
+        self.assertEqual(results['by_category']['mean']['alpha'], 3.0)
+
+
+class DatesTest(unittest.TestCase):
+    def test_date_range_is_temporal_for_non_padded_dates(self):
+        results = run_analysis([
+            {'date': '2024-10-01', 'amount': 1},
+            {'date': '2024-1-5', 'amount': 2},
+            {'date': '2024-9-30', 'amount': 3},
+        ])
+        self.assertEqual(results['date_range'], {'start': '2024-1-5', 'end': '2024-10-01'})
+
+    def test_null_dates_are_skipped(self):
+        results = run_analysis([
+            {'date': None, 'amount': 1},
+            {'date': '2024-03-02', 'amount': 2},
+            {'date': '2024-01-15', 'amount': 3},
+        ])
+        self.assertEqual(results['date_range'], {'start': '2024-01-15', 'end': '2024-03-02'})
+        self.assertEqual(results['monthly_trends'], {'periods': ['2024-01', '2024-03'], 'amounts': [3.0, 2.0]})
+
+    def test_all_null_dates(self):
+        results = run_analysis([{'date': None, 'amount': 1}, {'date': None, 'amount': 2}])
+        self.assertEqual(results['date_range'], {'start': None, 'end': None})
+
+    def test_mixed_offset_dates(self):
+        results = run_analysis([
+            {'date': '2024-01-05T10:00:00+02:00', 'amount': 1},
+            {'date': '2024-01-05T09:00:00+00:00', 'amount': 2},
+            {'date': '2024-02-10T12:00:00+01:00', 'amount': 4},
+        ])
+        # 10:00+02:00 is 08:00 UTC, an hour before 09:00+00:00
+        self.assertEqual(results['date_range'], {'start': '2024-01-05T10:00:00+02:00', 'end': '2024-02-10T12:00:00+01:00'})
+        self.assertEqual(results['monthly_trends'], {'periods': ['2024-01', '2024-02'], 'amounts': [3.0, 4.0]})
+
+    def test_month_does_not_depend_on_other_rows(self):
+        # 00:30+01:00 on Feb 1 is 23:30 UTC on Jan 31, with or without other offsets present
+        boundary = {'date': '2024-02-01T00:30:00+01:00', 'amount': 1}
+        alone = run_analysis([boundary])
+        mixed = run_analysis([boundary, {'date': '2024-03-01T12:00:00+00:00', 'amount': 2}])
+        self.assertEqual(alone['monthly_trends']['periods'], ['2024-01'])
+        self.assertEqual(mixed['monthly_trends']['periods'], ['2024-01', '2024-03'])
+
+    def test_naive_dates_keep_their_month(self):
+        results = run_analysis([{'date': '2024-02-01T00:30:00', 'amount': 1}])
+        self.assertEqual(results['monthly_trends']['periods'], ['2024-02'])
+
+
+if __name__ == '__main__':
+    unittest.main()
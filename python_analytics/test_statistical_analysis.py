@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'statistical_analysis.py')
+
+
+def run_analysis(records, columns):
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(records, f)
+    try:
+        completed = subprocess.run(
+            [sys.executable, SCRIPT, '--data_file', f.name, '--columns', ','.join(columns), '--analysis_id', 'test'],
+            capture_output=True, text=True, check=True
+        )
+    finally:
+        os.unlink(f.name)
+    return json.loads(completed.stdout)['results']
+
+
+def is_missing(value):
+    # NaN is written as null by orjson and as NaN by the stdlib json fallback
+    return value is None or math.isnan(value)
+
+
+class ConstantColumnTest(unittest.TestCase):
+    # Means like 0.7 or 123.456 are not exactly representable, so the variance is rounding noise, not zero
+    CONSTANTS = [0.7, 0.1, 2.3, 123.456]
+
+    def test_moments_are_undefined_for_constant_columns(self):
+        for value in self.CONSTANTS:
+            results = run_analysis([{'a': value} for _ in range(7)], ['a'])
+            self.assertTrue(is_missing(results['a']['skewness']), value)
+            self.assertTrue(is_missing(results['a']['kurtosis']), value)
+
+    def test_moments_of_varying_column(self):
+        results = run_analysis([{'a': 1.0}, {'a': 2.0}, {'a': 5.0}], ['a'])
+        self.assertAlmostEqual(results['a']['skewness'], 0.5280049792181882)
+        self.assertAlmostEqual(results['a']['kurtosis'], -1.5)
+
+    def test_correlation_is_undefined_for_constant_columns(self):
+        records = [{'a': 0.7, 'b': b} for b in (1, 2, 5)]
+        values = run_analysis(records, ['a', 'b'])['correlation_matrix']['values']
+        self.assertTrue(all(is_missing(v) for v in (values[0][0], values[0][1], values[1][0])))
+        self.assertEqual(values[1][1], 1.0)
+
+    def test_correlation_of_varying_columns(self):
+        records = [{'a': a, 'b': b} for a, b in ((1.0, 2.0), (2.0, 4.5), (5.0, 9.0))]
+        values = run_analysis(records, ['a', 'b'])['correlation_matrix']['values']
+        self.assertEqual(values[0][0], 1.0)
+        self.assertAlmostEqual(values[0][1], 0.9930989590856155)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,386 @@
+// Serper Web Search Tool Helper Test Suite
+import { promises as fs } from 'fs';
+import os from 'os';
+import path from 'path';
+import {
+  AimdController,
+  DiskScrapeCache,
+  RateLimitTracker,
+  RateLimiter,
+  Semaphore,
+  TtlCache,
+  dedupeResults,
+  nonNegativeOr,
+  normalizeUrl,
+} from '@/livingdossier/services/tools-livings/webSearchUtils';
+
+const NOW = new Date('2026-01-01T00:00:00Z');
+
+describe('Serper Web Search Tool Helpers', () => {
+
+  describe('RateLimitTracker', () => {
+    beforeEach(() => {
+      jest.useFakeTimers();
+      jest.setSystemTime(NOW);
+    });
+
+    afterEach(() => {
+      jest.useRealTimers();
+    });
+
+    test('Retry-After in seconds fails fast past the wait budget', async () => {
+      const tracker = new RateLimitTracker();
+      tracker.ingest({ 'retry-after': '120' });
+
+      await expect(tracker.waitIfLow(10000)).rejects.toThrow('quota resets in 120s');
+    });
+
+    test('Retry-After as an HTTP date fails fast past the wait budget', async () => {
+      const tracker = new RateLimitTracker();
+      tracker.ingest({ 'retry-after': new Date(NOW.getTime() + 90000).toUTCString() });
+
+      await expect(tracker.waitIfLow(10000)).rejects.toThrow('quota resets in 90s');
+    });
+
+    test('Retry-After in the past or far in the future is ignored', async () => {
+      const tracker = new RateLimitTracker();
+      tracker.ingest({ 'retry-after': new Date(NOW.getTime() - 1000).toUTCString() });
+      await expect(tracker.waitIfLow(10000)).resolves.toBeUndefined();
+
+      tracker.ingest({ 'retry-after': String(7 * 24 * 60 * 60) });
+      await expect(tracker.waitIfLow(10000)).resolves.toBeUndefined();
+    });
+
+    test.each([
+      ['epoch seconds', String(NOW.getTime() / 1000 + 60)],
+      ['epoch milliseconds', String(NOW.getTime() + 60000)],
+      ['delta seconds', '60'],
+    ])('Reset given as %s fails fast when remaining is 0', async (_format, reset) => {
+      const tracker = new RateLimitTracker();
+      tracker.ingest({ 'x-ratelimit-remaining': '0', 'x-ratelimit-limit': '100', 'x-ratelimit-reset': reset });
+
+      await expect(tracker.waitIfLow(10000)).rejects.toThrow('quota resets in 60s');
+    });
+
+    test('Low but non-zero remaining lets the request through instead of failing', async () => {
+      const tracker = new RateLimitTracker();
+      tracker.ingest({ 'x-ratelimit-remaining': '2', 'x-ratelimit-limit': '100', 'x-ratelimit-reset': '60' });
+
+      await expect(tracker.waitIfLow(10000)).resolves.toBeUndefined();
+    });
+
+    test('Low quota resetting within the wait budget waits for the reset', async () => {
+      const tracker = new RateLimitTracker();
+      tracker.ingest({ 'x-ratelimit-remaining': '0', 'x-ratelimit-limit': '100', 'x-ratelimit-reset': '5' });
+
+      let settled = false;
+      const wait = tracker.waitIfLow(10000).then(() => { settled = true; });
+      await jest.advanceTimersByTimeAsync(4000);
+      expect(settled).toBe(false);
+      await jest.advanceTimersByTimeAsync(1000);
+      await wait;
+      expect(settled).toBe(true);
+    });
+
+    test('A healthy response clears an earlier block', async () => {
+      const tracker = new RateLimitTracker();
+      tracker.ingest({ 'x-ratelimit-remaining': '0', 'x-ratelimit-limit': '100', 'x-ratelimit-reset': '60' });
+      tracker.ingest({ 'x-ratelimit-remaining': '80', 'x-ratelimit-limit': '100' });
+
+      await expect(tracker.waitIfLow(10000)).resolves.toBeUndefined();
+    });
+
+    test('Malformed counts are ignored', async () => {
+      const tracker = new RateLimitTracker();
+      tracker.ingest({ 'x-ratelimit-remaining': '0 requests', 'x-ratelimit-reset': '60' });
+
+      await expect(tracker.waitIfLow(10000)).resolves.toBeUndefined();
+    });
+  });
+
+  describe('RateLimiter', () => {
+    beforeEach(() => {
+      jest.useFakeTimers();
+      jest.setSystemTime(NOW);
+    });
+
+    afterEach(() => {
+      jest.useRealTimers();
+    });
+
+    test('Grants at most limit slots per window', async () => {
+      const limiter = new RateLimiter(2, 1000);
+      let granted = 0;
+      for (let i = 0; i < 5; i++) limiter.acquire().then(() => { granted++; });
+
+      await jest.advanceTimersByTimeAsync(0);
+      expect(granted).toBe(2);
+      await jest.advanceTimersByTimeAsync(1000);
+      expect(granted).toBe(4);
+      await jest.advanceTimersByTimeAsync(1000);
+      expect(granted).toBe(5);
+    });
+
+    test('A limit of 0 disables the limiter', async () => {
+      const limiter = new RateLimiter(0);
+      await Promise.all([limiter.acquire(), limiter.acquire(), limiter.acquire()]);
+    });
+
+    test('Malformed configured rates fall back to the default', () => {
+      expect(nonNegativeOr(parseInt('twenty'), 20)).toBe(20);
+      expect(nonNegativeOr(undefined, 20)).toBe(20);
+      expect(nonNegativeOr(-1, 20)).toBe(20);
+      expect(nonNegativeOr(0, 20)).toBe(0);
+      expect(nonNegativeOr(5, 20)).toBe(5);
+    });
+  });
+
+  describe('TtlCache', () => {
+    afterEach(() => {
+      jest.useRealTimers();
+    });
+
+    test('Expires entries after the TTL', () => {
+      jest.useFakeTimers();
+      jest.setSystemTime(NOW);
+      const cache = new TtlCache<string>(1000);
+      cache.set('a', 'value');
+
+      expect(cache.get('a')).toBe('value');
+      jest.setSystemTime(NOW.getTime() + 1000);
+      expect(cache.get('a')).toBeUndefined();
+    });
+
+    test('Evicts the oldest entry once full', () => {
+      const cache = new TtlCache<number>(60000, 2);
+      cache.set('a', 1);
+      cache.set('b', 2);
+      cache.set('c', 3);
+
+      expect(cache.get('a')).toBeUndefined();
+      expect(cache.get('b')).toBe(2);
+      expect(cache.get('c')).toBe(3);
+    });
+
+    test('A TTL of 0 disables caching', () => {
+      const cache = new TtlCache<number>(0);
+      cache.set('a', 1);
+
+      expect(cache.get('a')).toBeUndefined();
+    });
+
+    test('A malformed TTL falls back to the default instead of never expiring', () => {
+      jest.useFakeTimers();
+      jest.setSystemTime(NOW);
+      const cache = new TtlCache<string>(nonNegativeOr(parseInt('an hour'), 3600) * 1000);
+      cache.set('a', 'value');
+
+      jest.setSystemTime(NOW.getTime() + 3600 * 1000);
+      expect(cache.get('a')).toBeUndefined();
+    });
+  });
+
+  describe('Semaphore', () => {
+    test('Never runs more tasks than its limit', async () => {
+      const semaphore = new Semaphore(2);
+      let active = 0;
+      let peak = 0;
+      const task = () => semaphore.run(async () => {
+        active++;
+        peak = Math.max(peak, active);
+        await new Promise(resolve => setTimeout(resolve, 5));
+        active--;
+      });
+
+      await Promise.all([task(), task(), task(), task(), task()]);
+      expect(peak).toBe(2);
+    });
+
+    test('Raising the limit admits queued tasks', async () => {
+      const semaphore = new Semaphore(1);
+      await semaphore.acquire();
+      let admitted = false;
+      const waiting = semaphore.acquire().then(() => { admitted = true; });
+
+      await Promise.resolve();
+      expect(admitted).toBe(false);
+      semaphore.setLimit(2);
+      await waiting;
+      expect(admitted).toBe(true);
+    });
+  });
+
+  describe('AimdController', () => {
+    test('Halves on overload and recovers after consecutive successes', () => {
+      const semaphore = new Semaphore(8);
+      const controller = new AimdController(semaphore, 1, 8);
+
+      controller.record(true);
+      expect(semaphore.currentLimit).toBe(4);
+      controller.record(true);
+      controller.record(true);
+      controller.record(true);
+      expect(semaphore.currentLimit).toBe(1);
+
+      for (let i = 0; i < 20; i++) controller.record(false);
+      expect(semaphore.currentLimit).toBe(2);
+    });
+
+    test('A failure restarts the success window', () => {
+      const semaphore = new Semaphore(2);
+      const controller = new AimdController(semaphore, 1, 8, 1);
+
+      for (let i = 0; i < 9; i++) controller.record(false);
+      controller.record(true);
+      for (let i = 0; i < 9; i++) controller.record(false);
+      expect(semaphore.currentLimit).toBe(1);
+      controller.record(false);
+      expect(semaphore.currentLimit).toBe(2);
+    });
+
+    test('Never grows past its maximum', () => {
+      const semaphore = new Semaphore(8);
+      const controller = new AimdController(semaphore, 1, 8);
+
+      for (let i = 0; i < 100; i++) controller.record(false);
+      expect(semaphore.currentLimit).toBe(8);
+    });
+  });
+
+  describe('DiskScrapeCache', () => {
+    let dir: string;
+    const result = { success: true, url: 'https://example.com/a', content: 'page body', source: 'jina' as const };
+
+    beforeEach(async () => {
+      dir = await fs.mkdtemp(path.join(os.tmpdir(), 'scrape-cache-'));
+    });
+
+    afterEach(async () => {
+      await fs.rm(dir, { recursive: true, force: true });
+    });
+
+    const cacheFiles = async () => (await fs.readdir(dir)).filter(name => name.endsWith('.json'));
+    const age = async (file: string, ms: number) => {
+      const time = new Date(Date.now() - ms);
+      await fs.utimes(path.join(dir, file), time, time);
+    };
+
+    test('Round-trips a stored page', async () => {
+      const cache = new DiskScrapeCache(dir, 60000);
+      await cache.set('https://example.com/a', result);
+
+      expect(await cache.get('https://example.com/a')).toEqual(result);
+      expect(await cache.get('https://example.com/b')).toBeUndefined();
+    });
+
+    test('Expired files are not served', async () => {
+      const cache = new DiskScrapeCache(dir, 60000);
+      await cache.set('https://example.com/a', result);
+      await age((await cacheFiles())[0], 120000);
+
+      expect(await cache.get('https://example.com/a')).toBeUndefined();
+    });
+
+    test('Changed content rewrites the file', async () => {
+      const cache = new DiskScrapeCache(dir, 60000);
+      await cache.set('https://example.com/a', result);
+      await cache.set('https://example.com/a', { ...result, content: 'new body' });
+
+      expect((await cache.get('https://example.com/a'))?.content).toBe('new body');
+    });
+
+    test('Unchanged content refreshes the timestamp without rewriting the file', async () => {
+      const cache = new DiskScrapeCache(dir, 60000);
+      await cache.set('https://example.com/a', result);
+      const [file] = await cacheFiles();
+      // Mark the stored entry so a rewrite would be visible
+      const written = JSON.stringify({ ...JSON.parse(await fs.readFile(path.join(dir, file), 'utf8')), marker: true });
+      await fs.writeFile(path.join(dir, file), written);
+      await age(file, 30000);
+      const aged = (await fs.stat(path.join(dir, file))).mtimeMs;
+
+      await cache.set('https://example.com/a', { ...result });
+
+      expect(await fs.readFile(path.join(dir, file), 'utf8')).toBe(written);
+      expect((await fs.stat(path.join(dir, file))).mtimeMs).toBeGreaterThan(aged);
+    });
+
+    test('An unchanged page is written again once its expired file has been swept', async () => {
+      const cache = new DiskScrapeCache(dir, 60000);
+      await cache.set('https://example.com/a', result);
+      const [file] = await cacheFiles();
+      await fs.unlink(path.join(dir, file));
+
+      await cache.set('https://example.com/a', { ...result });
+
+      expect(await cache.get('https://example.com/a')).toEqual(result);
+    });
+
+    test('The sweep prunes the least recently refreshed files past the byte cap', async () => {
+      // About 750 bytes per cache file, so the 1600-byte cap holds two
+      const page = (url: string) => ({ ...result, url, content: url.repeat(28) });
+      const cache = new DiskScrapeCache(dir, 60000, 5000, 1600);
+      // Each write starts a background sweep; let it finish before the next write
+      const store = async (url: string) => {
+        await cache.set(url, page(url));
+        await new Promise(resolve => setTimeout(resolve, 50));
+      };
+      await store('https://example.com/a');
+      const [oldest] = await cacheFiles();
+      await age(oldest, 10000);
+      await store('https://example.com/b');
+      await store('https://example.com/c');
+
+      const remaining = await cacheFiles();
+      expect(remaining.length).toBe(2);
+      expect(remaining).not.toContain(oldest);
+    });
+
+    test('Write failures are reported, not thrown', async () => {
+      const warnings: string[] = [];
+      const blocker = path.join(dir, 'not-a-directory');
+      await fs.writeFile(blocker, '');
+      const cache = new DiskScrapeCache(blocker, 60000, 5000, 1500, message => warnings.push(message));
+
+      await cache.set('https://example.com/a', result);
+      expect(warnings.length).toBe(1);
+    });
+  });
+
+  describe('dedupeResults', () => {
+    test('Drops later hits with the same title and path, keeping the first', () => {
+      const results = [
+        { title: 'Launch Notes', link: 'https://example.com/blog/launch' },
+        { title: 'launch notes ', link: 'https://mirror.example.org/blog/launch/' },
+        { title: 'Release Notes', link: 'https://example.com/blog/launch' },
+      ];
+
+      expect(dedupeResults(results)).toEqual([results[0], results[2]]);
+    });
+
+    test('Keeps hits whose link cannot be parsed', () => {
+      const results = [
+        { title: 'Launch Notes', link: 'not a url' },
+        { title: 'Launch Notes', link: 'not a url' },
+      ];
+
+      expect(dedupeResults(results)).toEqual(results);
+    });
+  });
+
+  describe('normalizeUrl', () => {
+    test('Lowercases the host and drops default ports, fragments, trailing slashes and tracking params', () => {
+      expect(normalizeUrl(' HTTPS://Example.COM:443/Path/?utm_source=news&b=2&fbclid=x#section '))
+        .toBe('https://example.com/Path?b=2');
+    });
+
+    test('Leaves already-normal URLs unchanged', () => {
+      expect(normalizeUrl('http://example.com/?q=1')).toBe('http://example.com/?q=1');
+      expect(normalizeUrl('http://example.com:8080/a')).toBe('http://example.com:8080/a');
+    });
+
+    test('Falls back to the trimmed input when it is not a URL', () => {
+      expect(normalizeUrl('  not a url  ')).toBe('not a url');
+    });
+  });
+});